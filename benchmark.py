@@ -0,0 +1,157 @@
+"""
+性能测试脚本
+测量各模块的导入时间、不抓取命令的启动时间，以及读取历史数据的耗时和内存峰值
+（字典形式整体加载与紧凑的Snapshot整体加载对比）
+
+用法:
+    python benchmark.py [--scale 10] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent
+
+IMPORT_TARGETS = ['main', 'data_manager', 'wechat_notifier', 'query_service', 'scraper']
+
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+try:
+    import {module}
+except ImportError as e:
+    print('ERR', e)
+    raise SystemExit
+elapsed = time.perf_counter() - start
+heavy = [name for name in ('selenium', 'webdriver_manager', 'requests') if name in sys.modules]
+print(elapsed, ','.join(heavy))
+"""
+
+
+def measure_imports(repeat):
+    """在新的解释器中测量各模块的导入时间（取最小值）"""
+    print("\n导入时间（新解释器，取最小值）")
+    print("-" * 60)
+    for module in IMPORT_TARGETS:
+        best = None
+        heavy = ''
+        for _ in range(repeat):
+            result = subprocess.run(
+                [sys.executable, '-c', IMPORT_SCRIPT.format(module=module)],
+                cwd=ROOT, capture_output=True, text=True
+            )
+            output = result.stdout.strip()
+            if output.startswith('ERR'):
+                best = None
+                heavy = output
+                break
+            elapsed, heavy = output.split(' ', 1) if ' ' in output else (output, '')
+            best = min(best, float(elapsed)) if best is not None else float(elapsed)
+        if best is None:
+            print(f"{module:<16} 无法导入: {heavy[4:]}")
+        else:
+            print(f"{module:<16} {best * 1000:8.1f} ms   额外加载: {heavy or '无'}")
+
+
+def measure_command(command, data_dir, repeat):
+    """测量 main.py 子命令的总运行时间（包括解释器启动）"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(ROOT / 'main.py')] + command,
+            cwd=data_dir.parent, capture_output=True,
+            env=dict(os.environ, PYTHONPATH=str(ROOT))
+        )
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"main.py {' '.join(command):<10} {best * 1000:8.1f} ms")
+
+
+def measure_history(history_file, repeat):
+    """对比整体加载和流式读取历史数据的耗时和内存峰值"""
+    from data_manager import DataManager
+
+    def full_load():
+        with open(history_file, 'r', encoding='utf-8') as f:
+            return len(json.load(f))
+
+    data_manager = DataManager(history_file.parent)
+
+    def streaming():
+        return sum(1 for _ in data_manager.iter_history())
+
+    def full_load_dicts():
+        return data_manager._load_history()
+
+    def full_load_snapshots():
+        return data_manager.load_snapshots()
+
+    print(f"\n读取历史数据（{history_file.stat().st_size / 1024 / 1024:.1f} MB）")
+    print("-" * 60)
+    benchmarks = (
+        ('json.load', full_load),
+        ('iter_history', streaming),
+        ('_load_history', full_load_dicts),
+        ('load_snapshots', full_load_snapshots),
+    )
+    for name, func in benchmarks:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        # 保留返回值，使内存峰值包含整体加载后的数据
+        tracemalloc.start()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        print(f"{name:<16} {best * 1000:8.1f} ms   内存峰值: {peak / 1024 / 1024:7.2f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='性能测试')
+    parser.add_argument('--scale', type=int, default=10, help='历史数据放大倍数')
+    parser.add_argument('--repeat', type=int, default=5, help='每项测试重复次数')
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    measure_imports(args.repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / 'data'
+        data_dir.mkdir()
+        source = ROOT / 'data'
+        for name in ('daily_stats.json', 'weekly_stats.json'):
+            if (source / name).exists():
+                shutil.copy(source / name, data_dir / name)
+
+        # 把现有历史数据重复多次，模拟较长的历史文件
+        history = []
+        if (source / 'history.json').exists():
+            with open(source / 'history.json', 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        with open(data_dir / 'history.json', 'w', encoding='utf-8') as f:
+            json.dump(history * args.scale, f, ensure_ascii=False, indent=2)
+
+        print("\n不抓取命令的运行时间（包括解释器启动，取最小值）")
+        print("-" * 60)
+        measure_command(['stats'], data_dir, args.repeat)
+
+        measure_history(data_dir / 'history.json', args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,8 +5,14 @@
 
 import json
 import os
+import textwrap
+from collections import deque
 from datetime import datetime, timedelta
 from pathlib import Path
+from game_identity import GameRegistry
+from history_reader import iter_json_array
+from records import GameRecord, GrowthRecord, Snapshot
+from trend_detector import TrendDetector
 
 
 class DataManager:
@@ -18,44 +24,180 @@ class DataManager:
         self.history_file = self.data_dir / 'history.json'
         self.daily_file = self.data_dir / 'daily_stats.json'
         self.weekly_file = self.data_dir / 'weekly_stats.json'
+        self.anomalies_file = self.data_dir / 'anomalies.json'
+        self.intraday_file = self.data_dir / 'intraday.json'
+        
+        self.registry = GameRegistry(self.data_dir / 'game_registry.json')
+        self.trend_detector = TrendDetector(self.data_dir / 'trend_stats.json', self.registry)
         
     def save_current_data(self, games_data):
         """
-        保存当前抓取的数据
+        保存当前抓取的数据，并增量更新趋势统计
         
         Args:
             games_data: 游戏数据列表
+            
+        Returns:
+            list: 本次检测到的异常列表
         """
         timestamp = datetime.now().isoformat()
+        cutoff_date = datetime.now() - timedelta(days=30)
+        games_data = self.normalize_games(games_data)
         
-        # 读取历史数据
-        history = self._load_history()
+        # 首次启用趋势统计时，用已有历史补建一次
+        rebuild_trends = not self.trend_detector.has_state()
         
-        # 添加新数据
-        history.append({
-            'timestamp': timestamp,
-            'games': games_data
-        })
-        
-        # 只保留最近30天的数据
-        cutoff_date = datetime.now() - timedelta(days=30)
-        history = [
-            entry for entry in history
-            if datetime.fromisoformat(entry['timestamp']) > cutoff_date
-        ]
+        def entries():
+            # 逐条读取历史数据，只保留最近30天的数据
+            for entry in self.iter_history():
+                if rebuild_trends:
+                    games = self.normalize_games(entry['games'])
+                    self._record_names(games, entry['timestamp'])
+                    self.trend_detector.update(games, entry['timestamp'])
+                if datetime.fromisoformat(entry['timestamp']) > cutoff_date:
+                    yield entry
+            
+            # 添加新数据
+            yield {
+                'timestamp': timestamp,
+                'games': [game.to_dict() for game in games_data]
+            }
         
         # 保存
-        with open(self.history_file, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        count = self._write_history(entries())
             
-        print(f"数据已保存，历史记录数: {len(history)}")
+        print(f"数据已保存，历史记录数: {count}")
         
-    def _load_history(self):
-        """加载历史数据"""
+        # 更新游戏名历史和趋势统计
+        self._record_names(games_data, timestamp)
+        anomalies = self.trend_detector.update(games_data, timestamp)
+        self.trend_detector.prune(cutoff_date)
+        # 趋势统计以注册表中的游戏ID为键，先保存注册表
+        self.registry.save()
+        self.trend_detector.save()
+        self._save_anomalies(anomalies, timestamp)
+        
+        return anomalies
+    
+    def normalize_games(self, games):
+        """
+        把游戏URL统一为规范URL，并去掉指向同一游戏的重复项
+        
+        Args:
+            games: GameRecord或字典的列表
+            
+        Returns:
+            list: 规范化后的GameRecord列表（新的对象，不修改传入数据）
+        """
+        normalized = []
+        seen_ids = set()
+        for game in games:
+            if not isinstance(game, GameRecord):
+                game = GameRecord.from_dict(game)
+            game_id = self.registry.intern(game.url)
+            if game_id in seen_ids:
+                continue
+            seen_ids.add(game_id)
+            normalized.append(GameRecord(game.name, self.registry.url_of(game_id), game.likes, game.scraped_at))
+        return normalized
+    
+    def _record_names(self, games, seen_at):
+        """记录规范化后的游戏数据中的游戏名"""
+        for game in games:
+            self.registry.record_name(self.registry.intern(game.url), game.name, seen_at)
+    
+    def _compute_increases(self, current_games, previous_games, skip_missing=False):
+        """
+        按游戏ID对比两次数据，计算增长量
+        
+        Args:
+            current_games: 当前游戏数据（GameRecord或字典）
+            previous_games: 对比的历史快照（Snapshot）
+            skip_missing: 为True时跳过对比数据中没有的游戏，否则按0点赞计算
+            
+        Returns:
+            list: 按增长量排序的GrowthRecord列表
+        """
+        intern = self.registry.intern
+        
+        # 创建游戏ID到点赞数的映射
+        previous_likes = previous_games.likes_by_id()
+        
+        # 计算增长
+        increases = []
+        for game in self.normalize_games(current_games):
+            game_id = intern(game.url)
+            if skip_missing and game_id not in previous_likes:
+                continue
+            
+            previous = previous_likes.get(game_id, 0)
+            
+            increase = game.likes - previous
+            if increase > 0:  # 只记录有增长的
+                increases.append(GrowthRecord(game.name, game.url, game.likes, previous, increase))
+        
+        # 按增长量排序
+        increases.sort(key=lambda x: x.increase, reverse=True)
+        return increases
+    
+    def _write_history(self, entries):
+        """
+        逐条写入历史数据，格式与 json.dump(history, indent=2) 一致
+        
+        先写入临时文件再替换，写入过程中可以同时流式读取旧文件
+        
+        Args:
+            entries: 历史快照的可迭代对象
+            
+        Returns:
+            int: 写入的记录数
+        """
+        tmp_file = self.history_file.with_suffix('.json.tmp')
+        count = 0
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write('[\n' if count == 0 else ',\n')
+                    text = json.dumps(entry, ensure_ascii=False, indent=2)
+                    f.write(textwrap.indent(text, '  '))
+                    count += 1
+                f.write('\n]' if count else '[]')
+            os.replace(tmp_file, self.history_file)
+        except BaseException:
+            # 写入失败时删除临时文件，保留原来的history.json
+            tmp_file.unlink(missing_ok=True)
+            raise
+        return count
+        
+    def iter_history(self):
+        """
+        逐条读取历史数据，内存占用与文件大小无关
+        
+        Yields:
+            dict: 按时间顺序的历史快照
+        """
         if self.history_file.exists():
             with open(self.history_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+                yield from iter_json_array(f)
+    
+    def _load_history(self):
+        """加载全部历史数据"""
+        return list(self.iter_history())
+    
+    def iter_snapshots(self):
+        """
+        逐条读取历史数据并转换为紧凑的Snapshot（只保留游戏ID和点赞数）
+        
+        Yields:
+            Snapshot: 按时间顺序的历史快照
+        """
+        intern = self.registry.intern
+        for entry in self.iter_history():
+            yield Snapshot.from_entry(entry, intern)
+    
+    def load_snapshots(self):
+        """加载全部历史数据为Snapshot列表，内存占用远小于_load_history"""
+        return list(self.iter_snapshots())
     
     def calculate_daily_increase(self, current_games):
         """
@@ -67,37 +209,17 @@ class DataManager:
         Returns:
             list: 包含增长数据的游戏列表
         """
-        history = self._load_history()
+        # 只保留最近两条记录，不需要整体加载历史
+        history = deque(self.iter_snapshots(), maxlen=2)
         
         if len(history) < 2:
             print("历史数据不足，无法计算每日增长")
             return []
         
         # 获取上一次的数据（倒数第二条）
-        previous_data = history[-2]['games']
-        
-        # 创建游戏URL到点赞数的映射
-        previous_likes = {game['url']: game['likes'] for game in previous_data}
-        
-        # 计算增长
-        increases = []
-        for game in current_games:
-            url = game['url']
-            current_likes = game['likes']
-            previous = previous_likes.get(url, 0)
-            
-            increase = current_likes - previous
-            if increase > 0:  # 只记录有增长的
-                increases.append({
-                    'name': game['name'],
-                    'url': url,
-                    'current_likes': current_likes,
-                    'previous_likes': previous,
-                    'increase': increase
-                })
+        previous_data = history[-2]
         
-        # 按增长量排序
-        increases.sort(key=lambda x: x['increase'], reverse=True)
+        increases = [record.to_dict() for record in self._compute_increases(current_games, previous_data)]
         
         # 保存每日统计
         self._save_daily_stats(increases)
@@ -114,55 +236,74 @@ class DataManager:
         Returns:
             list: 包含增长数据的游戏列表
         """
-        history = self._load_history()
-        
-        if not history:
-            print("历史数据不足，无法计算每周增长")
-            return []
-        
-        # 获取7天前的数据
+        # 获取7天前的数据（按时间顺序流式读取，越过7天前即停止）
         week_ago = datetime.now() - timedelta(days=7)
         week_ago_data = None
+        has_history = False
         
-        for entry in history:
+        for entry in self.iter_history():
+            has_history = True
             entry_time = datetime.fromisoformat(entry['timestamp'])
             if entry_time <= week_ago:
-                week_ago_data = entry['games']
+                week_ago_data = entry
             else:
                 break
         
-        if not week_ago_data:
-            print("没有找到7天前的数据")
+        if not has_history:
+            print("历史数据不足，无法计算每周增长")
             return []
         
-        # 创建游戏URL到点赞数的映射
-        week_ago_likes = {game['url']: game['likes'] for game in week_ago_data}
-        
-        # 计算增长
-        increases = []
-        for game in current_games:
-            url = game['url']
-            current_likes = game['likes']
-            previous = week_ago_likes.get(url, 0)
-            
-            increase = current_likes - previous
-            if increase > 0:
-                increases.append({
-                    'name': game['name'],
-                    'url': url,
-                    'current_likes': current_likes,
-                    'previous_likes': previous,
-                    'increase': increase
-                })
+        if not week_ago_data or not week_ago_data['games']:
+            print("没有找到7天前的数据")
+            return []
         
-        # 按增长量排序
-        increases.sort(key=lambda x: x['increase'], reverse=True)
+        week_ago_data = Snapshot.from_entry(week_ago_data, self.registry.intern)
+        increases = [record.to_dict() for record in self._compute_increases(current_games, week_ago_data)]
         
         # 保存每周统计
         self._save_weekly_stats(increases)
         
         return increases
     
+    def calculate_latest_increases(self):
+        """
+        用最近一条非空快照计算每日和每周增长，只读取已保存的数据，不保存统计文件
+        
+        每日增长与它之前的一条非空快照对比，每周增长与它7天前（含）最近的一条非空快照对比
+        
+        Returns:
+            tuple: (每日增长列表, 每周增长列表)，格式与calculate_daily_increase相同
+        """
+        intern = self.registry.intern
+        latest = None
+        snapshots = []
+        for entry in self.iter_history():
+            # 抓取失败时保存的空快照不参与对比
+            if entry['games']:
+                latest = entry
+                snapshots.append(Snapshot.from_entry(entry, intern))
+        
+        if len(snapshots) < 2:
+            print("历史数据不足，无法计算增长")
+            return [], []
+        
+        current_games = latest['games']
+        daily = [record.to_dict() for record in self._compute_increases(current_games, snapshots[-2])]
+        
+        week_ago = datetime.fromisoformat(latest['timestamp']) - timedelta(days=7)
+        week_ago_data = None
+        for snapshot in snapshots[:-1]:
+            if datetime.fromisoformat(snapshot.timestamp) > week_ago:
+                break
+            week_ago_data = snapshot
+        
+        if week_ago_data is None:
+            print("没有找到7天前的数据")
+            return daily, []
+        
+        weekly = [record.to_dict() for record in self._compute_increases(current_games, week_ago_data)]
+        return daily, weekly
+    
     def _save_daily_stats(self, increases):
         """保存每日统计数据"""
         stats = {
@@ -183,6 +324,95 @@ class DataManager:
         with open(self.weekly_file, 'w', encoding='utf-8') as f:
             json.dump(stats, f, ensure_ascii=False, indent=2)
     
+    def get_hot_games(self, limit=20):
+        """
+        按平均日增长（EWMA）获取最热门的游戏，用于高频采样
+        
+        Args:
+            limit: 返回的数量
+            
+        Returns:
+            list: GameRecord列表（点赞数待抓取）
+        """
+        stats = self.trend_detector.stats
+        hot = sorted(stats, key=lambda game_id: stats[game_id]['mean'], reverse=True)[:limit]
+        return [GameRecord(stats[game_id]['name'], self.registry.url_of(game_id)) for game_id in hot]
+    
+    def save_intraday_sample(self, games_data, keep_hours=48):
+        """
+        保存一次日内采样（只包含部分热门游戏，不写入history.json）
+        
+        Args:
+            games_data: 游戏数据列表
+            keep_hours: 保留最近多少小时的采样
+            
+        Returns:
+            list: 与上一次采样相比的增长数据
+        """
+        timestamp = datetime.now().isoformat()
+        games_data = self.normalize_games(games_data)
+        
+        samples = []
+        if self.intraday_file.exists():
+            with open(self.intraday_file, 'r', encoding='utf-8') as f:
+                samples = json.load(f)
+        
+        increases = []
+        if samples:
+            # 热门游戏列表会变化，只对比上次也采样过的游戏
+            previous = Snapshot.from_entry(samples[-1], self.registry.intern)
+            increases = [
+                record.to_dict()
+                for record in self._compute_increases(games_data, previous, skip_missing=True)
+            ]
+        
+        cutoff_date = datetime.now() - timedelta(hours=keep_hours)
+        samples = [
+            sample for sample in samples
+            if datetime.fromisoformat(sample['timestamp']) > cutoff_date
+        ]
+        samples.append({
+            'timestamp': timestamp,
+            'games': [game.to_dict() for game in games_data]
+        })
+        
+        with open(self.intraday_file, 'w', encoding='utf-8') as f:
+            json.dump(samples, f, ensure_ascii=False, indent=2)
+        
+        print(f"日内采样已保存，采样记录数: {len(samples)}")
+        return increases
+    
+    def _save_anomalies(self, anomalies, timestamp):
+        """保存本次检测到的异常"""
+        stats = {
+            'timestamp': timestamp,
+            'anomalies': anomalies
+        }
+        
+        with open(self.anomalies_file, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+    
+    def get_anomalies(self, kind=None):
+        """
+        获取最近一次检测到的异常
+        
+        Args:
+            kind: 'spike'、'new_fast' 或 'reset'，为None时返回全部
+            
+        Returns:
+            list: 异常列表
+        """
+        if not self.anomalies_file.exists():
+            return []
+        
+        with open(self.anomalies_file, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+            
+        anomalies = stats.get('anomalies', [])
+        if kind:
+            anomalies = [a for a in anomalies if a['type'] == kind]
+        return anomalies
+    
     def get_top_games(self, period='daily', limit=10):
         """
         获取排名前N的游戏
@@ -0,0 +1,145 @@
+"""
+游戏标识模块
+统一游戏URL（规范化、提取slug），并把规范URL映射为紧凑的整数ID，
+爬虫、数据管理和查询服务都通过这里识别同一个游戏
+"""
+
+import json
+import os
+from pathlib import Path
+from urllib.parse import urlsplit
+
+
+def canonicalize_url(url):
+    """
+    规范化游戏URL
+
+    统一为 https、去掉 www.、去掉查询参数/锚点和末尾斜杠，
+    例如 http://www.AZGames.io/dead-strike/?ref=home → https://azgames.io/dead-strike
+
+    Args:
+        url: 原始URL
+
+    Returns:
+        str: 规范化后的URL
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = '/'.join(segment for segment in parts.path.split('/') if segment)
+    return f"https://{host}/{path}" if path else f"https://{host}"
+
+
+def extract_slug(url):
+    """
+    提取游戏slug（路径最后一段）
+
+    Args:
+        url: 游戏URL（可以是未规范化的）
+
+    Returns:
+        str: slug，例如 dead-strike
+    """
+    return canonicalize_url(url).rsplit('/', 1)[-1]
+
+
+class GameRegistry:
+    def __init__(self, state_file=None):
+        """
+        初始化游戏注册表
+
+        Args:
+            state_file: 保存路径，为None时只在内存中使用
+        """
+        self.state_file = Path(state_file) if state_file else None
+        self.urls = []        # ID -> 规范URL
+        self.names = []       # ID -> [{'name': 游戏名, 'since': 首次使用该名字的时间}, ...]
+        self._ids = {}        # 规范URL -> ID
+        self._raw_ids = {}    # 原始URL -> ID，避免重复规范化
+        self._load()
+
+    def _load(self):
+        """加载已保存的注册表"""
+        if not self.state_file or not self.state_file.exists():
+            return
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            for game in json.load(f):
+                self._ids[game['url']] = len(self.urls)
+                self.urls.append(game['url'])
+                self.names.append(game['names'])
+
+    def save(self):
+        """保存注册表"""
+        if not self.state_file:
+            return
+        games = [
+            {'id': game_id, 'url': url, 'names': names}
+            for game_id, (url, names) in enumerate(zip(self.urls, self.names))
+        ]
+        # 先写入临时文件再替换，查询服务同时读取时不会读到写了一半的文件
+        tmp_file = self.state_file.with_suffix('.json.tmp')
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(games, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except BaseException:
+            tmp_file.unlink(missing_ok=True)
+            raise
+
+    def intern(self, url):
+        """
+        获取URL对应的游戏ID，未见过的游戏分配新ID
+
+        Args:
+            url: 游戏URL（可以是未规范化的）
+
+        Returns:
+            int: 游戏ID
+        """
+        game_id = self._raw_ids.get(url)
+        if game_id is not None:
+            return game_id
+
+        canonical = canonicalize_url(url)
+        game_id = self._ids.get(canonical)
+        if game_id is None:
+            game_id = len(self.urls)
+            self._ids[canonical] = game_id
+            self.urls.append(canonical)
+            self.names.append([])
+        self._raw_ids[url] = game_id
+        return game_id
+
+    def lookup(self, url):
+        """
+        查找URL对应的游戏ID，不分配新ID
+
+        Returns:
+            int: 游戏ID，未见过时返回None
+        """
+        game_id = self._raw_ids.get(url)
+        if game_id is None:
+            game_id = self._ids.get(canonicalize_url(url))
+        return game_id
+
+    def url_of(self, game_id):
+        """获取游戏ID对应的规范URL"""
+        return self.urls[game_id]
+
+    def record_name(self, game_id, name, seen_at):
+        """
+        记录游戏名，名字变化时追加到名字历史
+
+        Args:
+            game_id: 游戏ID
+            name: 本次抓取到的游戏名
+            seen_at: 抓取时间（ISO格式字符串）
+        """
+        history = self.names[game_id]
+        if not history or history[-1]['name'] != name:
+            history.append({'name': name, 'since': seen_at})
+
+    def name_history(self, game_id):
+        """获取游戏的名字历史"""
+        return list(self.names[game_id])
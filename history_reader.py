@@ -0,0 +1,97 @@
+"""
+历史数据流式读取模块
+逐条解析JSON数组中的元素，内存占用只与单个元素大小有关，
+适用于体积很大的 history.json
+"""
+
+import json
+
+_DELIMITERS = ' \t\r\n,]'
+
+
+def _check_trailing(f, buf, chunk_size):
+    """数组结束后只允许出现空白字符（与json.load一致）"""
+    while True:
+        if buf.strip():
+            raise ValueError(f"历史文件格式错误: 数组结束后还有多余内容 {buf.strip()[:20]!r}")
+        buf = f.read(chunk_size)
+        if not buf:
+            return
+
+
+def iter_json_array(f, chunk_size=64 * 1024):
+    """
+    逐个读取文件中顶层JSON数组的元素
+
+    Args:
+        f: 以文本模式打开的文件对象
+        chunk_size: 每次读取的字符数
+
+    Yields:
+        数组中的每个元素
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    eof = False
+    while not buf and not eof:
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf = chunk.lstrip()
+
+    if not buf:
+        return
+    if buf[0] != '[':
+        raise ValueError("历史文件格式错误: 顶层不是JSON数组")
+    buf = buf[1:]
+    expect_value = True  # 下一个应为元素；为False时应为逗号或结束符
+    after_comma = False  # 刚读过逗号，此时不允许出现结束符
+
+    while True:
+        buf = buf.lstrip()
+        if not buf:
+            if eof:
+                raise ValueError("历史文件格式错误: 数组未正确结束")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+            continue
+
+        if not expect_value:
+            if buf[0] == ']':
+                _check_trailing(f, buf[1:], chunk_size)
+                return
+            if buf[0] != ',':
+                raise ValueError(f"历史文件格式错误: 期望 ',' 但遇到 {buf[0]!r}")
+            buf = buf[1:]
+            expect_value = True
+            after_comma = True
+            continue
+
+        if buf[0] == ']':
+            if after_comma:
+                raise ValueError("历史文件格式错误: 数组末尾多余的逗号")
+            _check_trailing(f, buf[1:], chunk_size)
+            return
+
+        try:
+            value, end = decoder.raw_decode(buf)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # 元素尚未读完整，继续读取（单个元素很大时逐步加大读取量）
+            chunk = f.read(max(chunk_size, len(buf)))
+            eof = not chunk
+            buf += chunk
+            continue
+
+        if not eof and (end == len(buf) or buf[end] not in _DELIMITERS):
+            # 数字等标量可能被截断在缓冲区末尾，读到更多内容后再解析
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+            continue
+
+        yield value
+        buf = buf[end:]
+        expect_value = False
+        after_comma = False
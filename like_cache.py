@@ -0,0 +1,140 @@
+"""
+点赞数缓存模块
+按游戏页面URL缓存最近一次的点赞数、ETag/Last-Modified和抓取时间，
+用于TTL内直接跳过，以及通过条件请求（If-None-Match）判断页面是否变化；
+并记录哪些页面的HTML中没有点赞数（由页面脚本渲染），这些页面不再发送HTTP请求
+"""
+
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+class LikeCache:
+    def __init__(self, state_file, ttl=timedelta(minutes=30)):
+        """
+        初始化点赞数缓存
+
+        Args:
+            state_file: 缓存的保存路径
+            ttl: 在此时间内抓取过的页面直接使用缓存，不发送请求
+        """
+        self.state_file = Path(state_file)
+        self.ttl = ttl
+        self.entries = self._load()
+        self.reset_counters()
+
+    def _load(self):
+        """加载缓存"""
+        if self.state_file.exists():
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def save(self):
+        """保存缓存"""
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+
+    def reset_counters(self):
+        """清零本次运行的统计"""
+        self.hits = 0           # TTL内直接使用缓存
+        self.not_modified = 0   # 条件请求返回304
+        self.misses = 0         # 需要完整加载页面
+        self.bytes_downloaded = 0
+
+    def get_fresh(self, url):
+        """
+        获取TTL内的缓存点赞数
+
+        Returns:
+            int: 点赞数，没有缓存或已过期时返回None
+        """
+        entry = self.entries.get(url)
+        if not entry or entry['likes'] is None:
+            return None
+        if datetime.now() - datetime.fromisoformat(entry['fetched_at']) > self.ttl:
+            return None
+        self.hits += 1
+        return entry['likes']
+
+    def get_cached(self, url):
+        """
+        获取缓存的点赞数（不论是否过期），用于页面抓取失败时的后备
+
+        Returns:
+            int: 点赞数，没有缓存时返回None
+        """
+        entry = self.entries.get(url)
+        return entry['likes'] if entry else None
+
+    def html_has_likes(self, url):
+        """页面HTML中是否可能包含点赞数（未记录过的页面视为可能包含）"""
+        entry = self.entries.get(url)
+        return not entry or entry.get('html_likes', True)
+
+    def mark_no_html_likes(self, url):
+        """记录页面HTML中没有点赞数，之后直接用浏览器加载该页面"""
+        entry = self.entries.setdefault(url, {
+            'likes': None,
+            'fetched_at': None,
+        })
+        entry['etag'] = None
+        entry['last_modified'] = None
+        entry['html_likes'] = False
+
+    def conditional_headers(self, url):
+        """
+        生成条件请求头
+
+        只有点赞数是从页面HTML中解析出来时才保存校验信息，
+        否则页面未变化并不代表点赞数未变化
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since 请求头
+        """
+        entry = self.entries.get(url)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def revalidated(self, url):
+        """
+        页面返回304时调用，刷新抓取时间
+
+        Returns:
+            int: 缓存的点赞数
+        """
+        entry = self.entries[url]
+        entry['fetched_at'] = datetime.now().isoformat()
+        self.not_modified += 1
+        return entry['likes']
+
+    def store(self, url, likes, etag=None, last_modified=None):
+        """
+        记录一次完整抓取的结果（保留页面HTML中是否有点赞数的记录）
+
+        Args:
+            etag, last_modified: 只有点赞数可靠地解析自页面HTML时才传入
+        """
+        self.entries[url] = {
+            'likes': likes,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': datetime.now().isoformat(),
+            'html_likes': self.html_has_likes(url),
+        }
+        self.misses += 1
+
+    def summary(self):
+        """本次运行的缓存统计"""
+        total = self.hits + self.not_modified + self.misses
+        return (
+            f"点赞缓存: 命中 {self.hits}，304未变化 {self.not_modified}，"
+            f"未命中 {self.misses}（共 {total}），"
+            f"下载 {self.bytes_downloaded / 1024:.1f} KB"
+        )
@@ -1,110 +1,342 @@
 """
 主程序
 整合爬虫、数据管理和通知功能
+
+用法:
+    python main.py [scrape]          抓取、保存、计算增长并发送通知（默认）
+    python main.py report [--send]   用已保存的数据重新计算并输出报告
+    python main.py resend [--weekly] 重新发送最近一次保存的报告
+    python main.py stats             查看已保存数据的概况
+    python main.py daemon            常驻运行，按配置的周期运行多个任务
+
+只有 scrape 和 daemon 需要 selenium/Chrome，各命令只导入自己用到的模块，
+不抓取的命令可以快速启动
 """
 
+import argparse
 import sys
-from datetime import datetime
-from scraper import GameScraper
-from data_manager import DataManager
-from wechat_notifier import WeChatNotifier
+from collections import deque
+from datetime import datetime, timedelta
 
 
-def main():
-    """主函数"""
-    print("=" * 60)
-    print(f"游戏点赞量监控系统")
-    print(f"运行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("=" * 60)
-    
-    # 配置要监控的网页
-    urls = [
-        'https://azgames.io/new-games',
-        # 后续可以添加更多网页
-    ]
-    
-    # 初始化组件
-    scraper = GameScraper(headless=True)
-    data_manager = DataManager()
-    notifier = WeChatNotifier()
-    
+# 配置要监控的网页
+URLS = [
+    'https://azgames.io/new-games',
+    # 后续可以添加更多网页
+]
+
+# 常驻模式的任务配置
+HOT_GAMES_LIMIT = 20              # 每小时采样的热门游戏数量
+HOT_INTERVAL = timedelta(hours=1)
+DAILY_AT = '07:00'                # 每天完整抓取的时间
+WEEKLY_AT = '07:30'               # 每周报告的时间（周一）
+JITTER_SECONDS = 300
+
+
+def scrape_all(scraper):
+    """抓取所有网页的游戏数据"""
     all_games = []
-    
-    try:
-        # 1. 抓取所有网页的游戏数据
-        print("\n步骤 1: 抓取游戏数据")
-        print("-" * 60)
-        
-        for url in urls:
-            print(f"\n正在抓取: {url}")
-            games = scraper.scrape_games(url)
-            all_games.extend(games)
-            print(f"从 {url} 抓取到 {len(games)} 个游戏")
-        
-        print(f"\n总共抓取到 {len(all_games)} 个游戏")
-        
-        # 2. 保存当前数据
-        print("\n步骤 2: 保存数据")
-        print("-" * 60)
-        data_manager.save_current_data(all_games)
-        
-        # 3. 计算增长量
-        print("\n步骤 3: 计算增长量")
-        print("-" * 60)
-        
-        daily_increases = data_manager.calculate_daily_increase(all_games)
-        print(f"每日增长游戏数: {len(daily_increases)}")
-        
-        weekly_increases = data_manager.calculate_weekly_increase(all_games)
-        print(f"每周增长游戏数: {len(weekly_increases)}")
-        
-        # 4. 发送通知
-        print("\n步骤 4: 发送微信通知")
-        print("-" * 60)
-        
-        # 获取TOP10
-        daily_top10 = daily_increases[:10] if daily_increases else []
-        weekly_top10 = weekly_increases[:10] if weekly_increases else []
-        
-        # 发送每日报告
-        if daily_top10:
-            print("\n发送每日报告...")
-            success = notifier.send_daily_report(daily_top10)
-            if success:
-                print("✓ 每日报告发送成功")
-            else:
-                print("✗ 每日报告发送失败")
+    for url in URLS:
+        print(f"\n正在抓取: {url}")
+        games = scraper.scrape_games(url)
+        all_games.extend(games)
+        print(f"从 {url} 抓取到 {len(games)} 个游戏")
+
+    print(f"\n总共抓取到 {len(all_games)} 个游戏")
+    if scraper.like_cache:
+        print(scraper.like_cache.summary())
+    return all_games
+
+
+def send_weekly_report(notifier, weekly_increases):
+    """发送每周报告"""
+    weekly_top10 = weekly_increases[:10] if weekly_increases else []
+    if weekly_top10:
+        print("\n发送每周报告...")
+        success = notifier.send_weekly_report(weekly_top10)
+        if success:
+            print("✓ 每周报告发送成功")
+        else:
+            print("✗ 每周报告发送失败")
+    else:
+        print("没有每周增长数据，跳过每周报告")
+
+
+def run_full(scraper, data_manager, notifier, weekly=True):
+    """
+    完整抓取一次并发送报告
+
+    Args:
+        weekly: 是否在周一发送每周报告（常驻模式下由单独的任务发送）
+    """
+    # 1. 抓取所有网页的游戏数据
+    print("\n步骤 1: 抓取游戏数据")
+    print("-" * 60)
+
+    if scraper.like_cache:
+        scraper.like_cache.reset_counters()
+
+    all_games = scrape_all(scraper)
+
+    # 2. 保存当前数据
+    print("\n步骤 2: 保存数据")
+    print("-" * 60)
+    anomalies = data_manager.save_current_data(all_games)
+    print(f"检测到异常游戏数: {len(anomalies)}")
+
+    # 3. 计算增长量
+    print("\n步骤 3: 计算增长量")
+    print("-" * 60)
+
+    daily_increases = data_manager.calculate_daily_increase(all_games)
+    print(f"每日增长游戏数: {len(daily_increases)}")
+
+    weekly_increases = data_manager.calculate_weekly_increase(all_games)
+    print(f"每周增长游戏数: {len(weekly_increases)}")
+
+    # 4. 发送通知
+    print("\n步骤 4: 发送微信通知")
+    print("-" * 60)
+
+    # 获取TOP10
+    daily_top10 = daily_increases[:10] if daily_increases else []
+
+    # 发送每日报告
+    if daily_top10:
+        print("\n发送每日报告...")
+        success = notifier.send_daily_report(daily_top10)
+        if success:
+            print("✓ 每日报告发送成功")
         else:
-            print("没有每日增长数据，跳过每日报告")
-        
-        # 发送每周报告（仅在周一发送）
+            print("✗ 每日报告发送失败")
+    else:
+        print("没有每日增长数据，跳过每日报告")
+
+    # 发送异常提醒
+    if anomalies:
+        print("\n发送异常提醒...")
+        success = notifier.send_anomaly_report(anomalies)
+        if success:
+            print("✓ 异常提醒发送成功")
+        else:
+            print("✗ 异常提醒发送失败")
+    else:
+        print("没有检测到异常，跳过异常提醒")
+
+    # 发送每周报告（仅在周一发送）
+    if weekly:
         if datetime.now().weekday() == 0:  # 0 = 周一
-            if weekly_top10:
-                print("\n发送每周报告...")
-                success = notifier.send_weekly_report(weekly_top10)
-                if success:
-                    print("✓ 每周报告发送成功")
-                else:
-                    print("✗ 每周报告发送失败")
-            else:
-                print("没有每周增长数据，跳过每周报告")
+            send_weekly_report(notifier, weekly_increases)
         else:
             print("今天不是周一，跳过每周报告")
-        
+
+
+def run_hot(scraper, data_manager):
+    """对热门游戏做一次日内采样"""
+    hot_games = data_manager.get_hot_games(HOT_GAMES_LIMIT)
+    if not hot_games:
+        print("暂无热门游戏数据，跳过日内采样")
+        return
+
+    if scraper.like_cache:
+        scraper.like_cache.reset_counters()
+
+    scraper.refresh_likes(hot_games)
+    if scraper.like_cache:
+        print(scraper.like_cache.summary())
+    increases = data_manager.save_intraday_sample(hot_games)
+    for game in increases[:5]:
+        print(f"  {game['name']}: +{game['increase']}")
+
+
+def run_weekly(data_manager, notifier):
+    """用最近一次完整抓取的数据计算并发送每周报告"""
+    latest = deque(data_manager.iter_history(), maxlen=1)
+    if not latest:
+        print("没有历史数据，跳过每周报告")
+        return
+
+    weekly_increases = data_manager.calculate_weekly_increase(latest[0]['games'])
+    send_weekly_report(notifier, weekly_increases)
+
+
+def run_daemon():
+    """常驻运行：浏览器和数据管理器在多次任务之间复用"""
+    from scraper import GameScraper
+    from data_manager import DataManager
+    from like_cache import LikeCache
+    from wechat_notifier import WeChatNotifier
+    from scheduler import Job, Scheduler
+
+    data_manager = DataManager()
+    scraper = GameScraper(headless=True, like_cache=LikeCache(data_manager.data_dir / 'like_cache.json'))
+    notifier = WeChatNotifier()
+
+    def with_browser(func):
+        # 任务出错后关闭浏览器，下次任务重新启动，避免复用已损坏的会话
+        def job():
+            try:
+                func()
+            except Exception:
+                scraper.close_driver()
+                raise
+        return job
+
+    jobs = [
+        Job('热门游戏日内采样', with_browser(lambda: run_hot(scraper, data_manager)),
+            interval=HOT_INTERVAL, jitter=JITTER_SECONDS),
+        Job('完整抓取', with_browser(lambda: run_full(scraper, data_manager, notifier, weekly=False)),
+            at=DAILY_AT, jitter=JITTER_SECONDS),
+        Job('每周报告', lambda: run_weekly(data_manager, notifier),
+            at=WEEKLY_AT, weekday=0),
+    ]
+
+    try:
+        Scheduler(jobs, lock_file=data_manager.data_dir / 'scheduler.lock').run_forever()
+    finally:
+        scraper.close_driver()
+
+
+def cmd_scrape(args):
+    """抓取一次并发送报告"""
+    from scraper import GameScraper
+    from data_manager import DataManager
+    from like_cache import LikeCache
+    from wechat_notifier import WeChatNotifier
+
+    # 初始化组件
+    data_manager = DataManager()
+    scraper = GameScraper(headless=True, like_cache=LikeCache(data_manager.data_dir / 'like_cache.json'))
+    notifier = WeChatNotifier()
+
+    try:
+        run_full(scraper, data_manager, notifier)
+
         print("\n" + "=" * 60)
         print("任务完成!")
         print("=" * 60)
-        
+
     except Exception as e:
         print(f"\n错误: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
-        
+
     finally:
         # 清理资源
         scraper.close_driver()
 
 
+def cmd_report(args):
+    """用最近一次保存的数据重新计算增长并输出报告"""
+    from data_manager import DataManager
+    from wechat_notifier import WeChatNotifier
+
+    data_manager = DataManager()
+    notifier = WeChatNotifier()
+
+    # 以最近一条非空快照为当前数据，只计算不保存，不覆盖抓取时保存的统计文件
+    daily_increases, weekly_increases = data_manager.calculate_latest_increases()
+    daily_top10 = daily_increases[:10]
+    weekly_top10 = weekly_increases[:10]
+
+    print(notifier.format_daily_report(daily_top10))
+    print(notifier.format_weekly_report(weekly_top10))
+
+    if args.send:
+        if daily_top10:
+            notifier.send_daily_report(daily_top10)
+        if weekly_top10:
+            notifier.send_weekly_report(weekly_top10)
+
+
+def cmd_resend(args):
+    """重新发送最近一次保存的日报或周报"""
+    from data_manager import DataManager
+    from wechat_notifier import WeChatNotifier
+
+    data_manager = DataManager()
+    notifier = WeChatNotifier()
+
+    period = 'weekly' if args.weekly else 'daily'
+    top_games = data_manager.get_top_games(period)
+    if not top_games:
+        print(f"没有已保存的{'每周' if args.weekly else '每日'}统计，跳过发送")
+        return
+
+    if args.weekly:
+        success = notifier.send_weekly_report(top_games)
+    else:
+        success = notifier.send_daily_report(top_games)
+    print("✓ 报告发送成功" if success else "✗ 报告发送失败")
+
+
+def cmd_stats(args):
+    """输出已保存数据的概况"""
+    from data_manager import DataManager
+
+    data_manager = DataManager()
+
+    count = 0
+    first = last = None
+    for entry in data_manager.iter_history():
+        if first is None:
+            first = entry
+        last = entry
+        count += 1
+
+    print(f"历史记录数: {count}")
+    if count:
+        print(f"最早记录: {first['timestamp']}")
+        print(f"最近记录: {last['timestamp']} ({len(last['games'])} 个游戏)")
+    print(f"已登记游戏数: {len(data_manager.registry.urls)}")
+
+    for period, title in (('daily', '每日'), ('weekly', '每周')):
+        top_games = data_manager.get_top_games(period, limit=3)
+        print(f"\n{title}增长TOP3:")
+        for i, game in enumerate(top_games, 1):
+            print(f"  {i}. {game['name']} +{game['increase']}")
+        if not top_games:
+            print("  暂无数据")
+
+    anomalies = data_manager.get_anomalies()
+    print(f"\n最近一次检测到的异常数: {len(anomalies)}")
+
+
+def cmd_daemon(args):
+    """常驻运行"""
+    run_daemon()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='游戏点赞量监控系统')
+    subparsers = parser.add_subparsers(dest='command')
+
+    subparsers.add_parser('scrape', help='抓取、保存、计算增长并发送通知（默认）')
+    report_parser = subparsers.add_parser('report', help='用已保存的数据重新计算并输出报告')
+    report_parser.add_argument('--send', action='store_true', help='同时发送到微信')
+    resend_parser = subparsers.add_parser('resend', help='重新发送最近一次保存的报告')
+    resend_parser.add_argument('--weekly', action='store_true', help='发送周报（默认日报）')
+    subparsers.add_parser('stats', help='查看已保存数据的概况')
+    subparsers.add_parser('daemon', help='常驻运行，按计划执行多个任务')
+
+    args = parser.parse_args()
+    commands = {
+        'scrape': cmd_scrape,
+        'report': cmd_report,
+        'resend': cmd_resend,
+        'stats': cmd_stats,
+        'daemon': cmd_daemon,
+    }
+
+    print("=" * 60)
+    print(f"游戏点赞量监控系统")
+    print(f"运行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 60)
+
+    commands[args.command or 'scrape'](args)
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,342 @@
+"""
+查询服务模块
+在历史数据上建立内存索引，并提供只读HTTP接口
+（单个游戏的时间序列、任意时间窗口的增长TOP-K、按名称搜索）
+"""
+
+import argparse
+import json
+import threading
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+from urllib.parse import urlparse, parse_qs
+from data_manager import DataManager
+from game_identity import GameRegistry
+
+
+class IndexState(NamedTuple):
+    """某一版本数据的完整索引，构建后不再修改，查询时整体读取"""
+    registry: GameRegistry  # 与本索引一起加载的游戏注册表
+    timestamps: list        # 每条快照的时间
+    series: dict            # 游戏ID -> (快照序号 array('i'), 点赞数 array('i'))
+    names: dict             # 游戏ID -> 最近一次的游戏名
+    latest: int             # 最近一条非空快照的序号
+    etag: str
+
+
+class HistoryIndex:
+    # 窗口起点与目标时间的最大偏差（再受窗口长度的一半限制）
+    MAX_WINDOW_TOLERANCE = timedelta(hours=12)
+
+    def __init__(self, data_manager):
+        """
+        初始化历史数据索引
+
+        Args:
+            data_manager: DataManager实例
+        """
+        self.data_manager = data_manager
+        self.version = None
+        self.state = IndexState(GameRegistry(), [], {}, {}, -1, '"empty"')
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        """历史文件和游戏注册表文件的 (修改时间, 大小)"""
+        version = []
+        for path in (self.data_manager.history_file, self.data_manager.registry.state_file):
+            try:
+                stat = path.stat()
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                version.append(None)
+        return tuple(version)
+
+    def refresh(self):
+        """历史文件或注册表变化时重建索引，未变化时直接返回"""
+        version = self._current_version()
+        if version == self.version:
+            return
+
+        with self._lock:
+            if version == self.version:
+                return
+            # 重新加载注册表，使游戏ID和名字历史与本次索引一致
+            registry = GameRegistry(self.data_manager.registry.state_file)
+            history_version = version[0]
+            history = self.data_manager.iter_history() if history_version else []
+            etag = '"' + '-'.join(f"{v[0]:x}.{v[1]:x}" if v else '0' for v in version) + '"'
+            self.state = self._build(registry, history, etag)
+            self.version = version
+
+    def _build(self, registry, history, etag):
+        """根据历史快照（可以是生成器）构建索引"""
+        intern = registry.intern
+        timestamps = []
+        series = {}
+        names = {}
+        latest = -1
+        for i, entry in enumerate(history):
+            timestamps.append(datetime.fromisoformat(entry['timestamp']))
+            if entry['games']:
+                latest = i
+            for game in entry['games']:
+                game_id = intern(game['url'])
+                if game_id not in series:
+                    series[game_id] = (array('i'), array('i'))
+                indexes, likes = series[game_id]
+                if indexes and indexes[-1] == i:
+                    # 同一快照中指向同一游戏的旧URL变体
+                    continue
+                indexes.append(i)
+                likes.append(game['likes'])
+                names[game_id] = game['name']
+
+        return IndexState(registry, timestamps, series, names, latest, etag)
+
+    def get_series(self, url, state=None):
+        """
+        获取单个游戏的点赞时间序列
+
+        Args:
+            url: 游戏页面URL（可以是未规范化的）
+            state: 使用的索引版本，默认为最新版本
+
+        Returns:
+            dict: 游戏名、名字历史和时间序列，游戏不存在时返回None
+        """
+        state = state or self.state
+        game_id = state.registry.lookup(url)
+        if game_id not in state.series:
+            return None
+        indexes, likes = state.series[game_id]
+        return {
+            'name': state.names[game_id],
+            'url': state.registry.url_of(game_id),
+            'name_history': state.registry.name_history(game_id),
+            'series': [
+                {'timestamp': state.timestamps[i].isoformat(), 'likes': n}
+                for i, n in zip(indexes, likes)
+            ]
+        }
+
+    def _window_start(self, state, window):
+        """
+        找到与 当前时间 - window 最接近的快照
+
+        每天的抓取时间会有几秒到几分钟的偏差，只取“不晚于目标时间”的快照
+        会让1天的窗口落到前天，因此取最接近目标时间的一条，偏差需在容差之内
+
+        Returns:
+            int: 快照序号，找不到时返回-1
+        """
+        timestamps, end = state.timestamps, state.latest
+        try:
+            target = timestamps[end] - window
+        except OverflowError:
+            return -1
+        tolerance = min(window / 2, self.MAX_WINDOW_TOLERANCE)
+
+        pos = bisect_right(timestamps, target, 0, end)
+        candidates = [i for i in (pos - 1, pos) if 0 <= i < end]
+        if not candidates:
+            return -1
+        start = min(candidates, key=lambda i: abs(timestamps[i] - target))
+        if abs(timestamps[start] - target) > tolerance:
+            return -1
+        return start
+
+    def top(self, window=timedelta(days=1), limit=10, state=None):
+        """
+        计算任意时间窗口内的增长TOP-K
+
+        Args:
+            window: 窗口长度（timedelta）
+            limit: 返回的数量
+            state: 使用的索引版本，默认为最新版本
+
+        Returns:
+            list: 与calculate_daily_increase相同格式的增长数据
+        """
+        state = state or self.state
+        end = state.latest
+        if end < 0 or window <= timedelta(0):
+            return []
+
+        # 以最近一条非空快照为当前数据
+        start = self._window_start(state, window)
+        if start < 0:
+            return []
+
+        url_of = state.registry.url_of
+        increases = []
+        for game_id, (indexes, likes) in state.series.items():
+            if indexes[-1] != end:
+                continue
+            current_likes = likes[-1]
+
+            base = bisect_right(indexes, start) - 1
+            previous = likes[base] if base >= 0 else 0
+
+            increase = current_likes - previous
+            if increase > 0:
+                increases.append({
+                    'name': state.names[game_id],
+                    'url': url_of(game_id),
+                    'current_likes': current_likes,
+                    'previous_likes': previous,
+                    'increase': increase
+                })
+
+        increases.sort(key=lambda x: x['increase'], reverse=True)
+        return increases[:limit]
+
+    def search(self, query, limit=20, state=None):
+        """
+        按名称搜索游戏（不区分大小写的子串匹配）
+
+        Args:
+            query: 搜索关键字
+            limit: 返回的数量
+            state: 使用的索引版本，默认为最新版本
+
+        Returns:
+            list: 匹配的游戏及其最新点赞数
+        """
+        state = state or self.state
+        query = query.strip().lower()
+        results = []
+        for game_id, name in state.names.items():
+            url = state.registry.url_of(game_id)
+            if query in name.lower() or query in url.lower():
+                results.append({
+                    'name': name,
+                    'url': url,
+                    'likes': state.series[game_id][1][-1]
+                })
+                if len(results) >= limit:
+                    break
+        return results
+
+
+def etag_matches(header, etag):
+    """
+    判断 If-None-Match 请求头是否匹配当前ETag（弱比较）
+
+    Args:
+        header: If-None-Match 请求头，可以包含逗号分隔的多个ETag或 *
+        etag: 当前ETag
+    """
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    if '*' in tags:
+        return True
+    return any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def parse_limit(params, default):
+    """
+    解析 limit 参数
+
+    Raises:
+        ValueError: 不是整数或小于1
+    """
+    limit = int(params.get('limit', [default])[0])
+    if limit < 1:
+        raise ValueError(f'limit 必须大于0: {limit}')
+    return limit
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """只读查询接口，index由make_server注入"""
+
+    index = None
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+
+        self.index.refresh()
+        state = self.index.state
+
+        # 先解析路径和参数，错误的请求不返回304
+        try:
+            if parsed.path == '/games':
+                query = params.get('q', [''])[0]
+                limit = parse_limit(params, 20)
+                compute = lambda: self.index.search(query, limit=limit, state=state)
+            elif parsed.path == '/games/series':
+                url = params.get('url', [''])[0]
+                body = self.index.get_series(url, state=state)
+                if body is None:
+                    self._send_json(404, {'error': f'未找到游戏: {url}'})
+                    return
+                compute = lambda: body
+            elif parsed.path == '/top':
+                window = timedelta(days=float(params.get('days', [1])[0]))
+                limit = parse_limit(params, 10)
+                compute = lambda: self.index.top(window, limit=limit, state=state)
+            else:
+                self._send_json(404, {'error': f'未知路径: {parsed.path}'})
+                return
+        except (ValueError, OverflowError) as e:
+            self._send_json(400, {'error': f'参数错误: {e}'})
+            return
+
+        if etag_matches(self.headers.get('If-None-Match'), state.etag):
+            self.send_response(304)
+            self.send_header('ETag', state.etag)
+            self.end_headers()
+            return
+
+        self._send_json(200, compute(), state.etag)
+
+    def _send_json(self, status, body, etag=None):
+        """发送JSON响应"""
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(data_manager, host='127.0.0.1', port=8000):
+    """
+    创建查询服务
+
+    Args:
+        data_manager: DataManager实例
+        host: 监听地址
+        port: 监听端口
+
+    Returns:
+        ThreadingHTTPServer: 尚未启动的HTTP服务
+    """
+    index = HistoryIndex(data_manager)
+    index.refresh()
+    handler = type('BoundQueryHandler', (QueryHandler,), {'index': index})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='游戏点赞历史数据查询服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--data-dir', default='data')
+    args = parser.parse_args()
+
+    server = make_server(DataManager(args.data_dir), args.host, args.port)
+    print(f"查询服务已启动: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
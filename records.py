@@ -0,0 +1,75 @@
+"""
+数据记录模块
+程序内部使用的紧凑数据结构，只在写入JSON和发送通知时转换为字典
+"""
+
+from array import array
+from dataclasses import dataclass, asdict
+
+
+@dataclass(slots=True)
+class GameRecord:
+    """一次抓取到的游戏"""
+    name: str
+    url: str
+    likes: int = 0
+    scraped_at: str = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """从history.json中的字典创建"""
+        return cls(data['name'], data['url'], data.get('likes', 0), data.get('scraped_at'))
+
+    def to_dict(self):
+        """转换为写入history.json的字典"""
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class GrowthRecord:
+    """一个游戏在两次抓取之间的增长"""
+    name: str
+    url: str
+    current_likes: int
+    previous_likes: int
+    increase: int
+
+    def to_dict(self):
+        """转换为统计文件和通知使用的字典"""
+        return asdict(self)
+
+
+class Snapshot:
+    """
+    一次历史快照的列式存储：游戏ID和点赞数分别保存在 array('i') 中，
+    不保留游戏名、URL等字符串，适合大量加载历史数据
+    """
+
+    __slots__ = ('timestamp', 'ids', 'likes')
+
+    def __init__(self, timestamp, ids=None, likes=None):
+        self.timestamp = timestamp
+        self.ids = ids if ids is not None else array('i')
+        self.likes = likes if likes is not None else array('i')
+
+    @classmethod
+    def from_entry(cls, entry, intern):
+        """
+        从history.json中的一条记录创建
+
+        Args:
+            entry: {'timestamp': ..., 'games': [...]} 字典
+            intern: URL到游戏ID的映射函数（GameRegistry.intern）
+        """
+        snapshot = cls(entry['timestamp'])
+        for game in entry['games']:
+            snapshot.ids.append(intern(game['url']))
+            snapshot.likes.append(game['likes'])
+        return snapshot
+
+    def __len__(self):
+        return len(self.ids)
+
+    def likes_by_id(self):
+        """游戏ID到点赞数的映射"""
+        return dict(zip(self.ids, self.likes))
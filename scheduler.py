@@ -0,0 +1,141 @@
+"""
+定时调度模块
+在一个常驻进程中按不同周期运行多个任务（每小时、每天定时、每周定时），
+支持随机抖动，并防止任务重叠和多个进程同时运行
+"""
+
+import os
+import random
+import time
+import traceback
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+class Job:
+    def __init__(self, name, func, interval=None, at=None, weekday=None, jitter=0):
+        """
+        定义一个定时任务
+
+        Args:
+            name: 任务名称
+            func: 任务函数（无参数）
+            interval: 运行间隔（timedelta），与at二选一
+            at: 每天运行的时间，格式 'HH:MM'
+            weekday: 与at配合使用，只在星期几运行（0=周一）
+            jitter: 随机延后的最大秒数，避免每次请求时间完全一致
+        """
+        if (interval is None) == (at is None):
+            raise ValueError(f"任务 {name} 需要且只能指定 interval 或 at 之一")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.at = datetime.strptime(at, '%H:%M').time() if at else None
+        self.weekday = weekday
+        self.jitter = jitter
+        self.next_run = None
+        self.last_duration = None
+
+    def schedule_next(self, now):
+        """根据当前时间计算下一次运行时间"""
+        if self.interval is not None:
+            planned = now + self.interval
+        else:
+            planned = datetime.combine(now.date(), self.at)
+            while planned <= now or (self.weekday is not None and planned.weekday() != self.weekday):
+                planned += timedelta(days=1)
+        self.next_run = planned + timedelta(seconds=random.uniform(0, self.jitter))
+
+
+class Scheduler:
+    def __init__(self, jobs, lock_file='data/scheduler.lock'):
+        """
+        初始化调度器
+
+        Args:
+            jobs: Job列表
+            lock_file: 进程锁文件路径，防止多个调度进程同时写数据
+        """
+        self.jobs = jobs
+        self.lock_file = Path(lock_file)
+        self._running = False
+
+    def _acquire_lock(self):
+        """创建进程锁文件，已有存活的调度进程时失败"""
+        try:
+            fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                pid = int(self.lock_file.read_text().strip())
+                os.kill(pid, 0)
+            except (ValueError, ProcessLookupError):
+                # 上次进程已退出但锁文件未清理
+                print(f"清理过期的锁文件: {self.lock_file}")
+                self.lock_file.unlink()
+                return self._acquire_lock()
+            except PermissionError:
+                pass
+            raise RuntimeError(f"已有调度进程在运行 (pid {pid})，锁文件: {self.lock_file}")
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+
+    def _release_lock(self):
+        """删除进程锁文件"""
+        try:
+            self.lock_file.unlink()
+        except FileNotFoundError:
+            pass
+
+    def run_job(self, job):
+        """
+        运行单个任务，任务出错不会中断调度
+
+        Returns:
+            bool: 是否运行成功
+        """
+        print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 开始任务: {job.name}")
+        start = time.monotonic()
+        try:
+            job.func()
+            success = True
+        except Exception as e:
+            print(f"任务 {job.name} 出错: {e}")
+            traceback.print_exc()
+            success = False
+        job.last_duration = time.monotonic() - start
+        print(f"任务 {job.name} 结束，耗时 {job.last_duration:.1f} 秒")
+        return success
+
+    def run_forever(self):
+        """按计划循环运行所有任务，直到stop()或KeyboardInterrupt"""
+        self._acquire_lock()
+        self._running = True
+        try:
+            now = datetime.now()
+            for job in self.jobs:
+                job.schedule_next(now)
+                print(f"任务 {job.name} 下次运行: {job.next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+
+            while self._running:
+                job = min(self.jobs, key=lambda j: j.next_run)
+                wait = (job.next_run - datetime.now()).total_seconds()
+                if wait > 0:
+                    # 分段睡眠，便于及时响应stop()
+                    time.sleep(min(wait, 30))
+                    continue
+
+                # 任务依次运行，同一时间只有一个任务使用浏览器和数据文件
+                self.run_job(job)
+
+                # 从结束时间重新计算，运行超时错过的周期直接跳过而不是补跑
+                job.schedule_next(datetime.now())
+                print(f"任务 {job.name} 下次运行: {job.next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+        except KeyboardInterrupt:
+            print("\n收到中断信号，停止调度")
+        finally:
+            self._running = False
+            self._release_lock()
+
+    def stop(self):
+        """请求停止调度循环"""
+        self._running = False
@@ -3,23 +3,109 @@
 负责从网页抓取游戏数据和点赞量
 """
 
+import re
 import time
 import json
 from datetime import datetime
+from html.parser import HTMLParser
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
+from game_identity import canonicalize_url, extract_slug
+from records import GameRecord
+
+
+class _LikesParser(HTMLParser):
+    """
+    从页面HTML中收集可能包含点赞数的元素，HTTP和浏览器两条路径共用：
+    类名中含有 like/thumb 单词的 button/div/span 元素（记录其内部文本），
+    以及带 data-likes 属性的元素
+    """
+    # 点赞元素的优先级，数值越小越优先，同一优先级按页面中出现的顺序
+    TAG_PRIORITY = {'button': 0, 'div': 1, 'span': 2}
+    COUNT_CLASSES = {'like-count', 'likes-count'}  # 任意标签上的这些类名也视为点赞元素
+    LIKE_WORDS = {'like', 'likes', 'thumb', 'thumbs'}
+    
+    def __init__(self):
+        super().__init__()
+        self.like_elements = []   # (优先级, 出现顺序, 内部文本, data-likes属性)
+        self.data_likes = []      # 非点赞元素上的 data-likes 属性值，按出现顺序
+        self._open = []           # 正在读取的点赞元素: [标签, 同名标签嵌套层数, 优先级, 出现顺序, 文本片段, data-likes]
+        self._order = 0
+    
+    @classmethod
+    def like_priority(cls, tag, class_attr):
+        """
+        判断元素是否为点赞元素
+        
+        类名按 - 和 _ 拆成单词后含有like/thumb（如 like-btn、likes_count，不含 unlikely）
+        
+        Returns:
+            int: 优先级，不是点赞元素时返回None
+        """
+        tokens = (class_attr or '').lower().split()
+        if tag in cls.TAG_PRIORITY:
+            for token in tokens:
+                if cls.LIKE_WORDS.intersection(re.split(r'[-_]', token)):
+                    return cls.TAG_PRIORITY[tag]
+        if cls.COUNT_CLASSES.intersection(tokens):
+            return len(cls.TAG_PRIORITY)
+        return None
+    
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        data_likes = (attrs.get('data-likes') or '').strip()
+        
+        for element in self._open:
+            if element[0] == tag:
+                element[1] += 1
+        
+        priority = self.like_priority(tag, attrs.get('class'))
+        if priority is not None:
+            self._open.append([tag, 1, priority, self._order, [], data_likes])
+            self._order += 1
+        elif data_likes.isdigit():
+            self.data_likes.append(int(data_likes))
+    
+    def handle_endtag(self, tag):
+        for element in list(self._open):
+            if element[0] != tag:
+                continue
+            element[1] -= 1
+            if element[1] == 0:
+                self._open.remove(element)
+                _, _, priority, order, text, data_likes = element
+                self.like_elements.append((priority, order, ''.join(text).strip(), data_likes))
+    
+    def handle_data(self, data):
+        for element in self._open:
+            element[4].append(data)
 
 
 class GameScraper:
-    def __init__(self, headless=True):
-        """初始化爬虫"""
+    # 用于统计已加载游戏卡片数量的选择器
+    CARD_SELECTOR = 'a[href*="azgames.io/"], a.game-link, a.game-card, div.game a'
+    
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    
+    def __init__(self, headless=True, like_cache=None):
+        """
+        初始化爬虫
+        
+        Args:
+            headless: 是否使用无头浏览器
+            like_cache: LikeCache实例，为None时每次都用浏览器加载游戏页面
+        """
         self.headless = headless
         self.driver = None
+        self.like_cache = like_cache
+        self.session = None
+        self.scroll_steps = []  # 最近一次滚动每步新增的卡片数量
         
     def setup_driver(self):
         """配置Chrome浏览器"""
@@ -30,7 +116,7 @@ class GameScraper:
         chrome_options.add_argument('--disable-dev-shm-usage')
         chrome_options.add_argument('--disable-gpu')
         chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+        chrome_options.add_argument(f'--user-agent={self.USER_AGENT}')
         
         try:
             # 尝试使用webdriver-manager自动管理驱动
@@ -50,17 +136,22 @@ class GameScraper:
     def close_driver(self):
         """关闭浏览器"""
         if self.driver:
-            self.driver.quit()
+            try:
+                self.driver.quit()
+            finally:
+                self.driver = None
             
-    def scrape_games(self, url):
+    def scrape_games(self, url, target_count=None, max_scroll_time=120):
         """
         抓取指定URL的游戏数据
         
         Args:
             url: 游戏列表页面URL
+            target_count: 加载到该数量的游戏卡片即停止滚动，为None时加载整个列表
+            max_scroll_time: 最长滚动时间（秒）
             
         Returns:
-            list: 游戏数据列表，每个游戏包含名称、链接、点赞量等信息
+            list: GameRecord列表，每个游戏包含名称、链接、点赞量等信息
         """
         if not self.driver:
             self.setup_driver()
@@ -68,12 +159,15 @@ class GameScraper:
         print(f"正在访问: {url}")
         self.driver.get(url)
         
-        # 等待页面加载
+        # 等待页面加载，出现游戏卡片即可开始滚动
         print("等待页面初始加载...")
-        time.sleep(5)  # 增加初始等待时间
+        try:
+            WebDriverWait(self.driver, 10).until(lambda driver: self._count_cards() > 0)
+        except TimeoutException:
+            print("未检测到游戏卡片，继续尝试滚动")
         
         # 滚动页面以加载所有内容
-        self._scroll_page()
+        self._scroll_page(target_count=target_count, max_time=max_scroll_time)
         
         games = []
         
@@ -101,6 +195,7 @@ class GameScraper:
             
             print(f"找到 {len(game_elements)} 个链接元素")
             
+            seen_urls = set()
             for element in game_elements:
                 try:
                     href = element.get_attribute('href')
@@ -118,13 +213,16 @@ class GameScraper:
                     if any(pattern in href for pattern in exclude_patterns):
                         continue
                     
+                    # 统一URL，避免 http/https、www.、末尾斜杠、查询参数产生重复游戏
+                    game_url = canonicalize_url(href)
+                    
                     # 确保是游戏页面（通常格式是 azgames.io/game-name）
-                    parts = href.replace('https://', '').replace('http://', '').split('/')
+                    parts = game_url.replace('https://', '').split('/')
                     if len(parts) < 2 or not parts[1]:
                         continue
                     
                     # 从URL中提取游戏名作为后备
-                    url_game_name = parts[1].replace('-', ' ').title()
+                    url_game_name = extract_slug(game_url).replace('-', ' ').title()
                         
                     game_name = element.text.strip()
                     
@@ -140,110 +238,281 @@ class GameScraper:
                     if not game_name or len(game_name) < 2:
                         continue
                     
-                    if href not in [g['url'] for g in games]:
-                        game_data = {
-                            'name': game_name,
-                            'url': href,
-                            'likes': 0,  # 默认值，后续会更新
-                            'scraped_at': datetime.now().isoformat()
-                        }
+                    if game_url not in seen_urls:
+                        seen_urls.add(game_url)
+                        game_data = GameRecord(
+                            name=game_name,
+                            url=game_url,
+                            likes=0,  # 默认值，后续会更新
+                            scraped_at=datetime.now().isoformat()
+                        )
                         games.append(game_data)
                         
                 except Exception as e:
                     continue
             
-            # 去重
-            unique_games = []
-            seen_urls = set()
-            for game in games:
-                if game['url'] not in seen_urls:
-                    seen_urls.add(game['url'])
-                    unique_games.append(game)
-            
-            print(f"找到 {len(unique_games)} 个游戏")
+            print(f"找到 {len(games)} 个游戏")
             
             # 获取每个游戏的点赞量
-            for i, game in enumerate(unique_games):
-                print(f"正在获取游戏 {i+1}/{len(unique_games)}: {game['name']}")
-                likes = self._get_game_likes(game['url'])
-                game['likes'] = likes
-                time.sleep(1)  # 避免请求过快
+            self.refresh_likes(games)
                 
         except Exception as e:
             print(f"抓取游戏列表时出错: {e}")
             
-        return unique_games
+        return games
+    
+    def refresh_likes(self, games):
+        """
+        逐个获取游戏页面的点赞量，更新游戏数据
+        
+        Args:
+            games: GameRecord列表（包含name和url），会被原地更新
+            
+        Returns:
+            list: 更新后的游戏数据列表
+        """
+        for i, game in enumerate(games):
+            print(f"正在获取游戏 {i+1}/{len(games)}: {game.name}")
+            hits_before = self.like_cache.hits if self.like_cache else 0
+            game.likes = self._get_game_likes(game.url)
+            game.scraped_at = datetime.now().isoformat()
+            if not self.like_cache or self.like_cache.hits == hits_before:
+                time.sleep(1)  # 避免请求过快，直接命中缓存时不需要等待
+        
+        if self.like_cache:
+            self.like_cache.save()
+        
+        return games
     
     def _get_game_likes(self, game_url):
         """
         获取单个游戏的点赞量
         
+        依次尝试：TTL内的缓存、HTTP条件请求（304时使用缓存，200时从HTML解析）、
+        浏览器加载页面
+        
         Args:
             game_url: 游戏页面URL
             
         Returns:
             int: 点赞数量
         """
+        if self.like_cache:
+            likes = self.like_cache.get_fresh(game_url)
+            if likes is not None:
+                return likes
+        
+        likes = self._get_game_likes_http(game_url)
+        if likes is not None:
+            return likes
+        
+        likes = self._get_game_likes_browser(game_url)
+        if likes is None:
+            # 找不到点赞数时使用缓存的旧值（不刷新缓存），返回0会被当作点赞数回落
+            cached = self.like_cache.get_cached(game_url) if self.like_cache else None
+            if cached is not None:
+                print(f"未获取到点赞数，使用缓存的 {cached} ({game_url})")
+                return cached
+            return 0
+        if self.like_cache:
+            # 点赞数来自页面脚本，页面未变化不代表点赞数未变化，不保存校验信息
+            self.like_cache.store(game_url, likes)
+        return likes
+    
+    def _get_game_likes_http(self, game_url):
+        """
+        通过HTTP请求获取点赞量，带上缓存的ETag/Last-Modified做条件请求
+        
+        已记录HTML中没有点赞数的页面不发送请求
+        
+        Returns:
+            int: 点赞数量，请求失败或HTML中没有点赞数时返回None
+        """
+        if not self.like_cache or not self.like_cache.html_has_likes(game_url):
+            return None
+        
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+            self.session.headers['User-Agent'] = self.USER_AGENT
+        
+        try:
+            response = self.session.get(
+                game_url,
+                headers=self.like_cache.conditional_headers(game_url),
+                timeout=10
+            )
+        except Exception as e:
+            print(f"HTTP请求失败，改用浏览器 ({game_url}): {e}")
+            return None
+        
+        self.like_cache.bytes_downloaded += len(response.content)
+        if response.status_code == 304:
+            return self.like_cache.revalidated(game_url)
+        if response.status_code != 200:
+            return None
+        
+        likes, reliable = self._parse_likes_html(response.text)
+        if likes is None:
+            # 点赞数由页面脚本渲染，之后直接用浏览器加载
+            self.like_cache.mark_no_html_likes(game_url)
+            return None
+        
+        if reliable:
+            self.like_cache.store(
+                game_url, likes,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+        else:
+            # 不能确定解析结果，不保存校验信息，避免304时一直使用可能错误的值
+            self.like_cache.store(game_url, likes)
+        return likes
+    
+    def _parse_likes_html(self, html):
+        """
+        从页面HTML中解析点赞数，HTTP响应和浏览器渲染后的页面都用这里解析，两条路径结果一致
+        
+        依次查找：点赞元素内部的文本（button、div、span、.like-count 的顺序），
+        点赞元素上的 data-likes 属性，最后是其他元素上的 data-likes 属性（可能属于页面中的其他游戏）
+        
+        Returns:
+            tuple: (点赞数量, 是否可靠)，找不到时点赞数量为None；
+                   只有页面中的点赞元素都指向同一个数字时才视为可靠
+        """
+        parser = _LikesParser()
+        parser.feed(html)
+        parser.close()
+        
+        values = []
+        for _, _, text, data_likes in sorted(parser.like_elements):
+            numbers = re.findall(r'\d+', text)
+            if numbers:
+                values.append((int(numbers[0]), text.isdigit()))
+            elif data_likes.isdigit():
+                values.append((int(data_likes), True))
+        
+        if values:
+            likes, exact = values[0]
+            return likes, exact and all(value == likes for value, _ in values)
+        if parser.data_likes:
+            return parser.data_likes[0], False
+        return None, False
+    
+    def _get_game_likes_browser(self, game_url):
+        """
+        用浏览器加载页面获取点赞量
+        
+        Returns:
+            int: 点赞数量，找不到或出错时返回None
+        """
+        if not self.driver:
+            self.setup_driver()
+        
         try:
             self.driver.get(game_url)
             time.sleep(2)
             
-            # 尝试多种可能的选择器来查找点赞数
-            selectors = [
-                'button[class*="like"]',
-                'button[class*="thumb"]',
-                'div[class*="like"]',
-                'span[class*="like"]',
-                '.likes-count',
-                '.like-count',
-                '[data-likes]',
-            ]
-            
-            for selector in selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements:
-                        text = element.text.strip()
-                        # 尝试从文本中提取数字
-                        if text and any(char.isdigit() for char in text):
-                            # 提取数字
-                            import re
-                            numbers = re.findall(r'\d+', text)
-                            if numbers:
-                                return int(numbers[0])
-                except:
-                    continue
-            
-            # 如果找不到点赞数，返回0
-            return 0
+            # 与HTTP路径使用同样的规则解析渲染后的页面
+            likes, _ = self._parse_likes_html(self.driver.page_source)
+            return likes
             
         except Exception as e:
             print(f"获取点赞量失败 ({game_url}): {e}")
-            return 0
+            return None
+    
+    def _count_cards(self):
+        """统计页面上已加载的游戏卡片数量"""
+        return self.driver.execute_script(
+            "return document.querySelectorAll(arguments[0]).length;",
+            self.CARD_SELECTOR
+        )
     
-    def _scroll_page(self):
-        """滚动页面以加载所有内容"""
+    def _wait_for_growth(self, count, quiet_period, poll_interval, end_time):
+        """
+        等待卡片数量增长，超过静默期仍未增长或到达总截止时间时返回
+        
+        Args:
+            end_time: 整个滚动过程的截止时间（time.monotonic()），静默期不会超过它
+        
+        Returns:
+            int: 等待结束时的卡片数量
+        """
+        deadline = min(time.monotonic() + quiet_period, end_time)
+        while time.monotonic() < deadline:
+            time.sleep(max(0, min(poll_interval, deadline - time.monotonic())))
+            new_count = self._count_cards()
+            if new_count > count:
+                # 仍在加载，刷新静默期，等这一批加载完
+                count = new_count
+                deadline = min(time.monotonic() + quiet_period, end_time)
+        return count
+    
+    def _click_load_more(self):
+        """点击“加载更多”按钮（如果页面上有）"""
+        return self.driver.execute_script("""
+            const pattern = /load more|show more|more games/i;
+            for (const el of document.querySelectorAll('button, a[role="button"], a.load-more, .load-more')) {
+                if (el.offsetParent !== null && pattern.test(el.textContent)) {
+                    el.click();
+                    return true;
+                }
+            }
+            return false;
+        """)
+    
+    def _scroll_page(self, target_count=None, max_time=120, quiet_period=2.0, poll_interval=0.25):
+        """
+        滚动页面以加载所有内容
+        
+        以游戏卡片数量判断是否加载完成：每次滚动到最后一张卡片（触发无限列表的哨兵元素），
+        在静默期内数量不再增长时尝试点击“加载更多”，仍无增长则认为已到列表末尾
+        
+        Args:
+            target_count: 卡片数量达到该值即停止，为None时加载到末尾
+            max_time: 最长滚动时间（秒）
+            quiet_period: 数量不再增长多久后视为本次滚动加载完毕（秒）
+            poll_interval: 检查卡片数量的间隔（秒）
+            
+        Returns:
+            list: 每次滚动新增的卡片数量
+        """
         print("开始滚动页面加载所有游戏...")
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
-        scroll_count = 0
-        max_scrolls = 10  # 最多滚动10次
-        
-        for i in range(max_scrolls):
-            # 滚动到底部
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            scroll_count += 1
-            print(f"第 {scroll_count} 次滚动...")
-            time.sleep(3)  # 增加等待时间
+        start = time.monotonic()
+        end_time = start + max_time
+        count = self._count_cards()
+        steps = []
+        
+        while True:
+            if target_count and count >= target_count:
+                print(f"已达到目标数量 {target_count}，停止滚动")
+                break
+            if time.monotonic() >= end_time:
+                print(f"超过最长滚动时间 {max_time} 秒，停止滚动")
+                break
+            
+            # 滚动到最后一张卡片和页面底部
+            self.driver.execute_script("""
+                const cards = document.querySelectorAll(arguments[0]);
+                if (cards.length) cards[cards.length - 1].scrollIntoView({block: 'end'});
+                window.scrollTo(0, document.body.scrollHeight);
+            """, self.CARD_SELECTOR)
+            new_count = self._wait_for_growth(count, quiet_period, poll_interval, end_time)
+            
+            if new_count == count and self._click_load_more():
+                new_count = self._wait_for_growth(count, quiet_period, poll_interval, end_time)
+            
+            steps.append(new_count - count)
+            print(f"第 {len(steps)} 次滚动: 新增 {new_count - count} 个卡片，共 {new_count} 个")
             
-            # 检查页面高度是否变化
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                print(f"页面高度不再变化，停止滚动")
+            if new_count == count:
+                print("卡片数量不再增长，停止滚动")
                 break
-            last_height = new_height
+            count = new_count
         
-        print(f"滚动完成，共滚动 {scroll_count} 次")
-        time.sleep(2)  # 最后再等待一下
+        self.scroll_steps = steps
+        print(f"滚动完成，共滚动 {len(steps)} 次，耗时 {time.monotonic() - start:.1f} 秒")
+        return steps
 
 
 if __name__ == '__main__':
@@ -255,7 +524,7 @@ if __name__ == '__main__':
         
         # 保存到文件
         with open('test_games.json', 'w', encoding='utf-8') as f:
-            json.dump(games, f, ensure_ascii=False, indent=2)
+            json.dump([game.to_dict() for game in games], f, ensure_ascii=False, indent=2)
         print("数据已保存到 test_games.json")
         
     finally:
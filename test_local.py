@@ -28,7 +28,7 @@ def test_scraper():
         print("-" * 60)
         
         # 抓取游戏数据
-        games = scraper.scrape_games(test_url)
+        games = [game.to_dict() for game in scraper.scrape_games(test_url)]
         
         print("\n" + "=" * 60)
         print(f"✓ 抓取完成！共获取 {len(games)} 个游戏")
@@ -0,0 +1,70 @@
+"""
+趋势检测测试脚本
+用 data/history.json 回放趋势检测，检查正常的一天只产生少量异常，
+以及抓取失败造成的点赞数回落不会在恢复时被当作突增
+"""
+
+import json
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from game_identity import GameRegistry
+from records import GameRecord
+from trend_detector import TrendDetector
+
+
+HISTORY_FILE = Path(__file__).resolve().parent / 'data' / 'history.json'
+MAX_DAILY_ANOMALIES = 5
+
+
+def new_detector(tmp):
+    """创建只在临时目录中保存状态的趋势检测器"""
+    return TrendDetector(Path(tmp) / 'trend_stats.json', GameRegistry())
+
+
+def test_replay_history():
+    """回放历史数据，每天的异常数量应保持在少数几个"""
+    with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+        history = [entry for entry in json.load(f) if entry['games']]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        detector = new_detector(tmp)
+        for entry in history:
+            games = [GameRecord.from_dict(game) for game in entry['games']]
+            anomalies = detector.update(games, entry['timestamp'])
+            print(f"{entry['timestamp'][:10]}: {len(anomalies)} 个异常 "
+                  f"{[(a['type'], a['name'], a['increase']) for a in anomalies]}")
+            assert len(anomalies) <= MAX_DAILY_ANOMALIES, entry['timestamp']
+        
+        # 每个游戏都只多了几个点赞，不应被标记为突增
+        last = history[-1]
+        timestamp = (datetime.fromisoformat(last['timestamp']) + timedelta(days=1)).isoformat()
+        games = [GameRecord(game['name'], game['url'], game['likes'] + 5) for game in last['games']]
+        anomalies = detector.update(games, timestamp)
+        print(f"每个游戏 +5 点赞: {len(anomalies)} 个异常")
+        assert not [a for a in anomalies if a['type'] == 'spike']
+
+
+def test_reset_recovery():
+    """点赞数回落到0后恢复，只产生一次reset，不产生突增，也不影响增长统计"""
+    likes = [10 * i for i in range(15)] + [0, 150, 160]
+    start = datetime(2026, 1, 1)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        detector = new_detector(tmp)
+        kinds = []
+        for day, count in enumerate(likes):
+            games = [GameRecord('Test Game', 'https://azgames.io/test-game', count)]
+            timestamp = (start + timedelta(days=day)).isoformat()
+            kinds += [a['type'] for a in detector.update(games, timestamp)]
+        
+        state = next(iter(detector.stats.values()))
+        print(f"异常: {kinds}，均值: {state['mean']:.1f}，方差: {state['var']:.1f}")
+        assert kinds == ['reset']
+        assert abs(state['mean'] - 10) < 1e-6 and state['var'] < 1e-6
+
+
+if __name__ == '__main__':
+    test_replay_history()
+    test_reset_recovery()
+    print("测试完成！")
@@ -0,0 +1,190 @@
+"""
+趋势检测模块
+增量维护每个游戏的点赞增长统计（EWMA均值、方差、最后出现时间），
+并据此标记异常：增长突增、新上榜快速增长、点赞数回落
+"""
+
+import json
+import math
+import os
+from datetime import datetime
+from pathlib import Path
+
+
+class TrendDetector:
+    def __init__(self, state_file, registry, alpha=0.3, z_threshold=3.0, min_samples=3,
+                 new_game_days=3, new_game_min_rate=50, min_std=1.0,
+                 min_spike_rate=20, rel_std=0.5):
+        """
+        初始化趋势检测器
+
+        Args:
+            state_file: 运行统计的保存路径
+            registry: GameRegistry，统计按其分配的游戏ID保存
+            alpha: EWMA平滑系数，越大越偏向最近的增长
+            z_threshold: 判定为突增的z分数阈值
+            min_samples: 计算z分数前至少需要的增长样本数
+            new_game_days: 首次出现后多少天内视为新游戏
+            new_game_min_rate: 新游戏被标记所需的最低日增长
+            min_std: 标准差下限，避免增长平稳的游戏被微小波动触发
+            min_spike_rate: 判定为突增所需的最低日增长（绝对值），大多数游戏平时日增长接近0，
+                            只看z分数时几个点赞就会被标记
+            rel_std: 标准差下限随均值增长的比例，即 max(std, rel_std * mean, min_std)
+        """
+        self.state_file = Path(state_file)
+        self.registry = registry
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_samples = min_samples
+        self.new_game_days = new_game_days
+        self.new_game_min_rate = new_game_min_rate
+        self.min_std = min_std
+        self.min_spike_rate = min_spike_rate
+        self.rel_std = rel_std
+        self.stats = self._load_state()
+
+    def _load_state(self):
+        """加载运行统计（JSON中游戏ID保存为字符串，旧版本以URL为键的统计转换为游戏ID）"""
+        if not self.state_file.exists():
+            return {}
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        return {
+            int(key) if key.isdigit() else self.registry.intern(key): state
+            for key, state in saved.items()
+        }
+
+    def has_state(self):
+        """是否已有保存的运行统计"""
+        return self.state_file.exists()
+
+    def save(self):
+        """保存运行统计（先写入临时文件再替换）"""
+        tmp_file = self.state_file.with_suffix('.json.tmp')
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.stats, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except BaseException:
+            tmp_file.unlink(missing_ok=True)
+            raise
+
+    def prune(self, cutoff_date):
+        """
+        删除最后出现时间早于cutoff_date的游戏（已离开历史数据范围）
+
+        Args:
+            cutoff_date: 与历史数据相同的保留截止时间
+
+        Returns:
+            int: 删除的游戏数
+        """
+        stale = [
+            key for key, state in self.stats.items()
+            if datetime.fromisoformat(state['last_seen']) <= cutoff_date
+        ]
+        for key in stale:
+            del self.stats[key]
+        return len(stale)
+
+    def update(self, games, timestamp):
+        """
+        用一次抓取结果更新统计，只遍历本次的游戏列表
+
+        Args:
+            games: GameRecord列表
+            timestamp: 本次抓取时间（ISO格式字符串）
+
+        Returns:
+            list: 本次检测到的异常列表
+        """
+        now = datetime.fromisoformat(timestamp)
+        anomalies = []
+
+        for game in games:
+            game_id = self.registry.intern(game.url)
+            likes = game.likes
+            state = self.stats.get(game_id)
+
+            if state is None:
+                self.stats[game_id] = {
+                    'name': game.name,
+                    'first_seen': timestamp,
+                    'last_seen': timestamp,
+                    'last_likes': likes,
+                    'mean': 0.0,
+                    'var': 0.0,
+                    'samples': 0,
+                }
+                continue
+
+            state['name'] = game.name
+            days = (now - datetime.fromisoformat(state['last_seen'])).total_seconds() / 86400
+            if days <= 0:
+                continue
+
+            delta = likes - state['last_likes']
+            previous_likes = state['last_likes']
+            state['last_seen'] = timestamp
+            state['last_likes'] = likes
+
+            rate = delta / days
+            if delta < 0:
+                # 点赞数回落（可能是抓取失败），不计入增长统计；
+                # 下一次从回落值恢复的增长同样不可信，也跳过一次
+                anomalies.append(self._anomaly('reset', game, previous_likes, delta, rate))
+                state['after_reset'] = True
+                continue
+            if state.pop('after_reset', False):
+                continue
+
+            anomaly = self._check_growth(state, game, previous_likes, delta, rate, now)
+            if anomaly:
+                anomalies.append(anomaly)
+            self._update_ewma(state, rate)
+
+        anomalies.sort(key=lambda x: x['rate'], reverse=True)
+        return anomalies
+
+    def _check_growth(self, state, game, previous_likes, delta, rate, now):
+        """根据更新前的统计判断本次增长是否异常"""
+        if state['samples'] >= self.min_samples:
+            if rate < self.min_spike_rate:
+                return None
+            std = max(math.sqrt(state['var']), self.rel_std * state['mean'], self.min_std)
+            z = (rate - state['mean']) / std
+            if z >= self.z_threshold:
+                anomaly = self._anomaly('spike', game, previous_likes, delta, rate)
+                anomaly['z_score'] = round(z, 2)
+                anomaly['expected_rate'] = round(state['mean'], 2)
+                return anomaly
+            return None
+
+        age = (now - datetime.fromisoformat(state['first_seen'])).total_seconds() / 86400
+        if age <= self.new_game_days and rate >= self.new_game_min_rate:
+            return self._anomaly('new_fast', game, previous_likes, delta, rate)
+        return None
+
+    def _update_ewma(self, state, rate):
+        """增量更新EWMA均值和方差"""
+        if state['samples'] == 0:
+            state['mean'] = float(rate)
+            state['var'] = 0.0
+        else:
+            diff = rate - state['mean']
+            incr = self.alpha * diff
+            state['mean'] += incr
+            state['var'] = (1 - self.alpha) * (state['var'] + diff * incr)
+        state['samples'] += 1
+
+    def _anomaly(self, kind, game, previous_likes, delta, rate):
+        """构造异常记录"""
+        return {
+            'type': kind,
+            'name': game.name,
+            'url': game.url,
+            'current_likes': game.likes,
+            'previous_likes': previous_likes,
+            'increase': delta,
+            'rate': round(rate, 2),
+        }
@@ -4,14 +4,13 @@
 """
 
 import os
-import requests
 from datetime import datetime
-from dotenv import load_dotenv
 
 
 class WeChatNotifier:
     def __init__(self):
         """初始化微信通知器"""
+        from dotenv import load_dotenv
         load_dotenv()
         self.webhook_url = os.getenv('WECHAT_WEBHOOK_URL')
         
@@ -39,6 +38,9 @@ class WeChatNotifier:
             }
         }
         
+        # 只在真正发送时导入，格式化报告不需要requests
+        import requests
+        
         try:
             response = requests.post(self.webhook_url, json=data)
             result = response.json()
@@ -75,6 +77,9 @@ class WeChatNotifier:
             }
         }
         
+        # 只在真正发送时导入，格式化报告不需要requests
+        import requests
+        
         try:
             response = requests.post(self.webhook_url, json=data)
             result = response.json()
@@ -142,6 +147,43 @@ class WeChatNotifier:
         
         return report
     
+    def format_anomaly_report(self, anomalies):
+        """
+        格式化异常报告
+        
+        Args:
+            anomalies: 趋势检测得到的异常列表
+            
+        Returns:
+            str: 格式化的报告内容
+        """
+        if not anomalies:
+            return "🚨 游戏点赞异常提醒\n\n暂无异常"
+        
+        titles = {
+            'spike': ("📈 增长突增", "info"),
+            'new_fast': ("🆕 新游戏快速增长", "info"),
+            'reset': ("⚠️ 点赞数回落", "warning"),
+        }
+        
+        report = "🚨 **游戏点赞异常提醒**\n"
+        report += f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
+        
+        for kind, (title, color) in titles.items():
+            games = [a for a in anomalies if a['type'] == kind]
+            if not games:
+                continue
+            report += f"### {title}\n\n"
+            for game in games[:10]:
+                report += f"• **{game['name']}**\n"
+                report += f"   ├ 当前点赞: {game['current_likes']}\n"
+                report += f"   ├ 上次点赞: {game['previous_likes']}\n"
+                if kind == 'spike':
+                    report += f"   ├ 平均日增长: {game['expected_rate']} (z={game['z_score']})\n"
+                report += f"   └ 日增长: <font color=\"{color}\">{game['rate']:+}</font>\n\n"
+        
+        return report
+    
     def send_daily_report(self, top_games):
         """发送每日报告"""
         content = self.format_daily_report(top_games)
@@ -151,6 +193,11 @@ class WeChatNotifier:
         """发送每周报告"""
         content = self.format_weekly_report(top_games)
         return self.send_markdown(content)
+    
+    def send_anomaly_report(self, anomalies):
+        """发送异常报告"""
+        content = self.format_anomaly_report(anomalies)
+        return self.send_markdown(content)
 
 
 if __name__ == '__main__':